@@ -3,8 +3,110 @@ ComfyUI PyTorch 2.10 Compatibility Patcher
 Automatically fixes WanVideoModel for PyTorch 2.10.0+ compatibility
 """
 
+import os
+import re
 import sys
-import torch
+
+# torch is imported on first use so node enumeration at startup stays cheap
+_TORCH_GE_210 = None
+
+
+def _torch_ge_210():
+    """Whether PyTorch is 2.10+, parsed once; tolerates suffixes like "2.10.0a0+gitxxxx" """
+    global _TORCH_GE_210
+    if _TORCH_GE_210 is None:
+        import torch
+        m = re.match(r'(\d+)\.(\d+)', torch.__version__)
+        _TORCH_GE_210 = m is not None and (int(m[1]), int(m[2])) >= (2, 10)
+    return _TORCH_GE_210
+
+
+# comfy.utils.string_to_seed, probed once; None until probed, False if unavailable
+_NEW_S2S = None
+
+
+def _new_string_to_seed():
+    """Return comfy.utils.string_to_seed, or False on ComfyUI versions without it"""
+    global _NEW_S2S
+    if _NEW_S2S is None:
+        try:
+            from comfy.utils import string_to_seed as _NEW_S2S
+        except ImportError:
+            _NEW_S2S = False
+    return _NEW_S2S
+
+
+# WanVideoWrapper lives next to this node in custom_nodes
+_CUSTOM_NODES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_WRAPPER_DIR = os.path.join(_CUSTOM_NODES_DIR, 'ComfyUI-WanVideoWrapper')
+_WRAPPER_PATH = os.path.join(_WRAPPER_DIR, 'nodes_model_loading.py')
+_UTILS_PATH = os.path.join(_WRAPPER_DIR, 'utils.py')
+
+# Names WanVideoWrapper modules are commonly registered under in sys.modules;
+# ComfyUI itself registers custom nodes under their directory path
+_WRAPPER_CANDIDATES = (
+    'custom_nodes.ComfyUI-WanVideoWrapper.nodes_model_loading',
+    'ComfyUI-WanVideoWrapper.nodes_model_loading',
+    _WRAPPER_DIR + '.nodes_model_loading',
+    'nodes_model_loading',
+)
+_UTILS_CANDIDATES = (
+    'custom_nodes.ComfyUI-WanVideoWrapper.utils',
+    'ComfyUI-WanVideoWrapper.utils',
+    _WRAPPER_DIR + '.utils',
+    'wanvideo_utils',
+)
+
+# Shared diffusion_model placeholder; nn.Identity is stateless, created on first patch
+_IDENTITY = None
+
+
+def _patched_init(self, *args, **kwargs):
+    """PyTorch 2.10+ compatible __init__"""
+    # Create placeholder diffusion_model BEFORE super().__init__()
+    # This satisfies PyTorch 2.10's stricter attribute checking
+    self.diffusion_model = _IDENTITY
+    
+    # Call original init (which calls super().__init__())
+    # The placeholder will be replaced with actual model later
+    type(self)._pt210_original_init(self, *args, **kwargs)
+
+
+_patched_init._pt210_patched = True
+
+
+def _find_loaded_module(candidates, name):
+    """Find an already-loaded WanVideoWrapper module, scanning sys.modules only on a miss"""
+    module = next((sys.modules[n] for n in candidates if n in sys.modules), None)
+    if module is None:
+        for module_name in sys.modules:
+            if 'WanVideoWrapper' in module_name and name in module_name:
+                module = sys.modules[module_name]
+                break
+    return module
+
+
+def _import_wrapper_module(dotted_name, alias, path):
+    """Import a WanVideoWrapper module, executing it from file only if it can't be found"""
+    import importlib
+    import importlib.util
+    
+    # import_module consults sys.modules first, so this never re-runs the module
+    try:
+        if importlib.util.find_spec(dotted_name) is not None:
+            return importlib.import_module(dotted_name)
+    except (ImportError, ValueError):
+        pass
+    
+    if not os.path.exists(path):
+        return None
+    
+    spec = importlib.util.spec_from_file_location(alias, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[alias] = module
+    return module
+
 
 class PyTorch210CompatibilityPatcher:
     """
@@ -36,17 +138,24 @@ class PyTorch210CompatibilityPatcher:
     CATEGORY = "WanVideoWrapper/Utils"
     OUTPUT_NODE = True
 
+    # Resolved modules and patch state, cached across calls
+    _wanvideo_module = None
+    _utils_module = None
+    _patched = False
+    _s2s_patched = False
+
     def patch_model(self, force_patch=True, fix_string_to_seed=True, verbose=True):
         """Apply PyTorch 2.10 compatibility patch to WanVideoModel"""
         
+        cls = type(self)
         status_messages = []
         
         # Get PyTorch version
+        import torch
         torch_version = torch.__version__
-        major, minor = map(int, torch_version.split('.')[:2])
         
         # Check if patch is needed
-        needs_patch = (major > 2 or (major == 2 and minor >= 10)) or force_patch
+        needs_patch = _torch_ge_210() or force_patch
         
         if not needs_patch:
             status = f"✅ PyTorch {torch_version} - No patch needed"
@@ -54,109 +163,105 @@ class PyTorch210CompatibilityPatcher:
                 print(status)
             return (status,)
         
-        try:
-            # Try to find WanVideoModel in sys.modules (already loaded by ComfyUI)
-            wanvideo_module = None
-            for module_name in sys.modules:
-                if 'WanVideoWrapper' in module_name and 'nodes_model_loading' in module_name:
-                    wanvideo_module = sys.modules[module_name]
-                    break
-            
-            if wanvideo_module is None:
-                # Try direct import (different possible paths)
-                try:
-                    from nodes_model_loading import WanVideoModel
-                except:
-                    # Last resort - search in custom_nodes
-                    import importlib.util
-                    import os
-                    custom_nodes_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)))
-                    wrapper_path = os.path.join(custom_nodes_dir, 'ComfyUI-WanVideoWrapper', 'nodes_model_loading.py')
-                    
-                    spec = importlib.util.spec_from_file_location("nodes_model_loading", wrapper_path)
-                    wanvideo_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(wanvideo_module)
-            
-            # Get WanVideoModel class
-            if hasattr(wanvideo_module, 'WanVideoModel'):
-                WanVideoModel = wanvideo_module.WanVideoModel
-            else:
-                WanVideoModel = getattr(wanvideo_module, 'WanVideoModel')
-            
-            import torch.nn as nn
-            
-            # Store original __init__
-            original_init = WanVideoModel.__init__
-            
-            # Create patched __init__
-            def patched_init(self, *args, **kwargs):
-                """PyTorch 2.10+ compatible __init__"""
-                # Create placeholder diffusion_model BEFORE super().__init__()
-                # This satisfies PyTorch 2.10's stricter attribute checking
-                self.diffusion_model = nn.Identity()
-                
-                # Call original init (which calls super().__init__())
-                # The placeholder will be replaced with actual model later
-                original_init(self, *args, **kwargs)
-            
-            # Apply monkey patch
-            WanVideoModel.__init__ = patched_init
-            
-            status_messages.append(f"✅ WanVideoModel patched for PyTorch {torch_version} compatibility")
-            if verbose:
-                print(f"✅ WanVideoModel patched for PyTorch {torch_version} compatibility")
-                print("   → diffusion_model placeholder added")
-                print("   → Compatible with PyTorch 2.9.0 and 2.10.0+")
-            
-        except ImportError as e:
-            msg = f"❌ Failed to import WanVideoModel: {e}"
-            status_messages.append(msg)
-            if verbose:
-                print(msg)
-        except Exception as e:
-            msg = f"❌ WanVideoModel patch failed: {e}"
+        if cls._patched:
+            msg = f"✅ WanVideoModel already patched for PyTorch {torch_version} compatibility"
             status_messages.append(msg)
             if verbose:
                 print(msg)
+        else:
+            try:
+                # Try to find WanVideoModel in sys.modules (already loaded by ComfyUI)
+                wanvideo_module = cls._wanvideo_module
+                if wanvideo_module is None:
+                    wanvideo_module = _find_loaded_module(_WRAPPER_CANDIDATES, 'nodes_model_loading')
+                
+                if wanvideo_module is None:
+                    # Try direct import (different possible paths)
+                    try:
+                        import nodes_model_loading as wanvideo_module
+                    except ImportError:
+                        try:
+                            # Last resort - import from custom_nodes
+                            wanvideo_module = _import_wrapper_module(
+                                'custom_nodes.ComfyUI-WanVideoWrapper.nodes_model_loading',
+                                "nodes_model_loading", _WRAPPER_PATH)
+                        except (ImportError, FileNotFoundError, AttributeError) as e:
+                            raise ImportError(f"could not load {_WRAPPER_PATH}: {e}") from e
+                        if wanvideo_module is None:
+                            raise ImportError(f"nodes_model_loading not found at {_WRAPPER_PATH}")
+                
+                # Get WanVideoModel class
+                WanVideoModel = getattr(wanvideo_module, 'WanVideoModel', None)
+                if WanVideoModel is None:
+                    raise AttributeError(f"WanVideoModel missing from {getattr(wanvideo_module, '__name__', wanvideo_module)}")
+                cls._wanvideo_module = wanvideo_module
+                
+                # Skip re-wrapping if __init__ is already patched (e.g. by another copy of this node)
+                if getattr(WanVideoModel.__init__, '_pt210_patched', False):
+                    cls._patched = True
+                    msg = f"✅ WanVideoModel already patched for PyTorch {torch_version} compatibility"
+                    status_messages.append(msg)
+                    if verbose:
+                        print(msg)
+                else:
+                    global _IDENTITY
+                    if _IDENTITY is None:
+                        _IDENTITY = torch.nn.Identity()
+                    
+                    # Store original __init__ and apply monkey patch
+                    WanVideoModel._pt210_original_init = WanVideoModel.__init__
+                    WanVideoModel.__init__ = _patched_init
+                    cls._patched = True
+                    
+                    status_messages.append(f"✅ WanVideoModel patched for PyTorch {torch_version} compatibility")
+                    if verbose:
+                        print(f"✅ WanVideoModel patched for PyTorch {torch_version} compatibility")
+                        print("   → diffusion_model placeholder added")
+                        print("   → Compatible with PyTorch 2.9.0 and 2.10.0+")
+                
+            except ImportError as e:
+                msg = f"❌ Failed to import WanVideoModel: {e}"
+                status_messages.append(msg)
+                if verbose:
+                    print(msg)
+            except Exception as e:
+                msg = f"❌ WanVideoModel patch failed: {e}"
+                status_messages.append(msg)
+                if verbose:
+                    print(msg)
         
         # Fix string_to_seed deprecation warning
-        if fix_string_to_seed:
+        run_s2s_fix = fix_string_to_seed and not cls._s2s_patched
+        new_string_to_seed = _new_string_to_seed() if run_s2s_fix else None
+        if run_s2s_fix and not new_string_to_seed:
+            # comfy.utils doesn't have it, keep old import
+            if verbose:
+                print("   ℹ️  string_to_seed patch skipped (ComfyUI version doesn't need it)")
+        elif run_s2s_fix:
             try:
                 # Find utils module
-                utils_module = None
-                for module_name in sys.modules:
-                    if 'WanVideoWrapper' in module_name and 'utils' in module_name:
-                        utils_module = sys.modules[module_name]
-                        break
+                utils_module = cls._utils_module
+                if utils_module is None:
+                    utils_module = _find_loaded_module(_UTILS_CANDIDATES, 'utils')
                 
                 if utils_module is None:
                     # Try importing directly
-                    import importlib.util
-                    import os
-                    custom_nodes_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)))
-                    utils_path = os.path.join(custom_nodes_dir, 'ComfyUI-WanVideoWrapper', 'utils.py')
-                    
-                    if os.path.exists(utils_path):
-                        spec = importlib.util.spec_from_file_location("wanvideo_utils", utils_path)
-                        utils_module = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(utils_module)
+                    utils_module = _import_wrapper_module(
+                        'custom_nodes.ComfyUI-WanVideoWrapper.utils',
+                        "wanvideo_utils", _UTILS_PATH)
                 
                 if utils_module:
+                    cls._utils_module = utils_module
                     # Patch string_to_seed import in utils module
                     # Replace the import to use comfy.utils instead of comfy.model_patcher
-                    try:
-                        from comfy.utils import string_to_seed as new_string_to_seed
-                        utils_module.string_to_seed = new_string_to_seed
-                        
-                        msg = "✅ string_to_seed deprecation fixed"
-                        status_messages.append(msg)
-                        if verbose:
-                            print(msg)
-                            print("   → Updated import from comfy.model_patcher to comfy.utils")
-                    except ImportError:
-                        # comfy.utils doesn't have it, keep old import
-                        if verbose:
-                            print("   ℹ️  string_to_seed patch skipped (ComfyUI version doesn't need it)")
+                    utils_module.string_to_seed = new_string_to_seed
+                    cls._s2s_patched = True
+                    
+                    msg = "✅ string_to_seed deprecation fixed"
+                    status_messages.append(msg)
+                    if verbose:
+                        print(msg)
+                        print("   → Updated import from comfy.model_patcher to comfy.utils")
                 else:
                     if verbose:
                         print("   ℹ️  WanVideoWrapper utils not found, string_to_seed patch skipped")
@@ -188,12 +293,12 @@ class PyTorchVersionChecker:
     def check_version(self):
         """Check PyTorch and CUDA versions"""
         
+        import torch
         torch_version = torch.__version__
         cuda_version = torch.version.cuda if torch.cuda.is_available() else "N/A"
         
         # Check if PyTorch 2.10+
-        major, minor = map(int, torch_version.split('.')[:2])
-        needs_patch = (major > 2 or (major == 2 and minor >= 10))
+        needs_patch = _torch_ge_210()
         
         print("=" * 60)
         print(f"PyTorch Version: {torch_version}")